@@ -1,30 +1,79 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
-import json
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, create_model
+from typing import Any, List, Optional, Union
+import asyncio
+import importlib
+import orjson
+import zstandard
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
+import mmap
 import os
-import glob
-
-# Import our scraping functions
-from scrap_pf import extract_mygap_pf_data, DATA_FIELDS as PF_DATA_FIELDS
-from scrap_am import extract_mygap_am_data, DATA_FIELDS as AM_DATA_FIELDS
-from scrap_my_organic import extract_mygap_organic_data, DATA_FIELDS as ORGANIC_DATA_FIELDS
-from scrap_tanaman import extract_mygap_tanaman_data, DATA_FIELDS as TANAMAN_DATA_FIELDS
+import re
+from pathlib import Path
+import sys
+import tempfile
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib json module"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="MyGAP Data Scraper API",
     description="API to fetch Malaysian Good Agricultural Practice (MyGAP) certification data",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
+# Record lists are repetitive and compress well; a low level keeps the CPU cost
+# below that of encoding the JSON in the first place
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=3)
+
+# Cache files live in their own directory so lookups never walk unrelated files
+CACHE_DIR = Path(os.environ.get("MYGAP_CACHE_DIR", "cache"))
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# The API keeps one zstd-compressed cache file per dataset, replaced atomically on refresh
+PF_CACHE_FILE = str(CACHE_DIR / "mygap_data_pf.json.zst")
+AM_CACHE_FILE = str(CACHE_DIR / "mygap_data_am.json.zst")
+ORGANIC_CACHE_FILE = str(CACHE_DIR / "myorganic_data.json.zst")
+TANAMAN_CACHE_FILE = str(CACHE_DIR / "mygap_data_tanaman.json.zst")
+
+# Cache files younger than this are served instead of scraping the website again
+FRESH_SECONDS = 86400
+
+# How long a cached response body is served before the cache file is checked again
+CACHE_RECHECK_SECONDS = 60
+
+# Serialized /mygap/data/{kind} responses, split around their timestamp by
+# _split_at_timestamp and keyed by the mtime of the file they were built from.
+# PF also holds the /mygap/stats response under "stats_body"
+_DATASET_CACHE = {kind: {"mtime": 0.0, "body": None, "checked_at": 0.0} for kind in ("pf", "am", "organic", "tanaman")}
+_DATASET_CACHE["pf"]["stats_body"] = None
+_DATASET_CACHE_LOCKS = {kind: asyncio.Lock() for kind in _DATASET_CACHE}
+
+# Running background refreshes of stale cache files, at most one per dataset
+_REFRESH_TASKS = {}
+
+# Newest scraper output file per prefix as (path, mtime, scanned_at), so the
+# fallback directory scan runs at most once per CACHE_RECHECK_SECONDS
+_LATEST_SCANS = {}
+
+# Matches on the first non-whitespace character, so blank checks need no strip() copy
+_has_content = re.compile(r"\S").search
+
 # Pydantic models for API responses
 class MyGAPRecord_PF(BaseModel):
     """MyGAP Plant & Fresh certification record model"""
@@ -72,6 +121,21 @@ class MyGAPRecord_Organic(BaseModel):
     tarikh_pensijilan: Optional[str] = None      # Certification Date
     tempoh_sah_laku: Optional[str] = None        # Validity Period/Expiry Date
 
+class MyGAPRecord_Tanaman(BaseModel):
+    """MyGAP Tanaman certification record model"""
+    no_pensijilan: Optional[str] = None          # Certification Number
+    projek: Optional[str] = None                 # Applicant Category
+    nama: Optional[str] = None                   # Name
+    negeri: Optional[str] = None                 # State
+    daerah: Optional[str] = None                 # District
+    jenis_tanaman: Optional[str] = None          # Plant Type
+    kategori_komoditi: Optional[str] = None      # Commodity Category
+    kategori_tanaman: Optional[str] = None       # Plant Category
+    luas_ladang: Optional[str] = None            # Farm Area (Ha)
+    tahun_pensijilan: Optional[str] = None       # Certification Year
+    tarikh_pensijilan: Optional[str] = None      # Certification Date
+    tempoh_sah_laku: Optional[str] = None        # Expiry Date
+
 # Keep the original generic model for backward compatibility
 class MyGAPRecord(BaseModel):
     """Generic MyGAP record model for backward compatibility"""
@@ -114,6 +178,13 @@ class MyGAPResponse_Organic(BaseModel):
     timestamp: str
     data: List[MyGAPRecord_Organic]
 
+class MyGAPResponse_Tanaman(BaseModel):
+    success: bool
+    message: str
+    total_records: int
+    timestamp: str
+    data: List[MyGAPRecord_Tanaman]
+
 # Keep the original generic response model for backward compatibility
 class MyGAPResponse(BaseModel):
     success: bool
@@ -122,6 +193,74 @@ class MyGAPResponse(BaseModel):
     timestamp: str
     data: List[MyGAPRecord]
 
+def _cache_file_adapter(record_model):
+    """
+    Build a TypeAdapter that validates a cache file - either a bare record list
+    or a {"metadata": ..., "data": [...]} document - straight from JSON bytes
+    """
+    cache_file_model = create_model(f"{record_model.__name__}_CacheFile", data=(List[record_model], ...))
+    return TypeAdapter(Union[List[record_model], cache_file_model])
+
+def _records_from_json(adapter, raw_bytes):
+    """Validate cache file bytes with a _cache_file_adapter and return the record list"""
+    parsed = adapter.validate_json(raw_bytes)
+    return parsed if isinstance(parsed, list) else parsed.data
+
+def _source(label, cache_file, fallback_prefix, module, record_model, response_model):
+    """
+    Describe one dataset: where it is cached, which scraper module fetches it
+    and how it is validated. The record model mirrors the scraper's
+    DATA_FIELDS, so the field list comes from the model and the scraper is
+    only imported once a scrape is needed. List validators are built once
+    here; pydantic-core then validates a whole dataset in a single call
+    instead of one model __init__ per record
+    """
+    return {
+        "label": label,
+        "cache_file": cache_file,
+        "fallback_prefix": fallback_prefix,
+        "module": module,
+        "fields": list(record_model.model_fields),
+        "records_adapter": TypeAdapter(List[record_model]),
+        "cache_adapter": _cache_file_adapter(record_model),
+        "response_model": response_model,
+    }
+
+# Every dataset served under /mygap/data/{kind}
+_SOURCES = {
+    "pf": _source("PF", PF_CACHE_FILE, "mygap_data_pf_", "scrap_pf",
+                  MyGAPRecord_PF, MyGAPResponse_PF),
+    "am": _source("AM", AM_CACHE_FILE, "mygap_data_am_", "scrap_am",
+                  MyGAPRecord_AM, MyGAPResponse_AM),
+    "organic": _source("Organic", ORGANIC_CACHE_FILE, "myorganic_data_", "scrap_my_organic",
+                       MyGAPRecord_Organic, MyGAPResponse_Organic),
+    "tanaman": _source("Tanaman", TANAMAN_CACHE_FILE, "mygap_data_tanaman_", "scrap_tanaman",
+                       MyGAPRecord_Tanaman, MyGAPResponse_Tanaman),
+}
+
+# Fields reported by /mygap/stats, built once instead of per request. Interned so
+# lookups against records built from the same names compare by identity
+_PF_STATS_FIELDS = tuple(sys.intern(field) for field in _SOURCES["pf"]["fields"])
+
+@lru_cache(maxsize=None)
+def _scraper(kind):
+    """
+    Import a dataset's scraper on first use. The scrapers pull in requests and
+    lxml, which a server answering from its cache never needs
+    
+    Returns:
+        function: The module's extract_mygap_*_data function
+    """
+    module = importlib.import_module(_SOURCES[kind]["module"])
+    return getattr(module, f"extract_mygap_{kind}_data")
+
+def _scrape(kind):
+    """
+    Scrape a dataset without saving files. Meant for run_in_threadpool, so the
+    first call's scraper import also happens in the worker, off the event loop
+    """
+    return _scraper(kind)(save_to_file=False)
+
 class FieldStats(BaseModel):
     field_name: str
     completed_count: int
@@ -135,397 +274,548 @@ class StatsResponse(BaseModel):
     timestamp: str
     field_statistics: List[FieldStats]
 
+@lru_cache(maxsize=1)
+def _iso_timestamp(second):
+    """Local time in ISO format for a whole second since the epoch"""
+    return datetime.fromtimestamp(second).isoformat()
+
+def _timestamp(_time=time.time):
+    """
+    Current local time in ISO format, to the second. The string is built once
+    per second and reused by every response in that second
+    """
+    return _iso_timestamp(int(_time()))
+
+# Stands in for the timestamp while a cached response body is encoded, so the
+# body can be split around it and stamped with the current time per request
+_TIMESTAMP_SLOT = "@@timestamp@@"
+
+def _split_at_timestamp(body):
+    """
+    Split an encoded response body around _TIMESTAMP_SLOT. The envelope puts
+    the timestamp before the records, so the first occurrence is the slot
+    
+    Returns:
+        tuple: (bytes before the slot, bytes after it)
+    """
+    prefix, _, suffix = body.partition(_TIMESTAMP_SLOT.encode())
+    return prefix, suffix
+
+def _stamp(parts):
+    """Join a body split by _split_at_timestamp around the current time"""
+    return b"".join((parts[0], _timestamp().encode(), parts[1]))
+
+def _find_latest_cache(prefix, suffix=".json"):
+    """
+    Find the newest file named prefix*suffix in CACHE_DIR in a single directory
+    pass, stat-ing each candidate only once
+    
+    Returns:
+        tuple: (path, mtime) of the newest file, or (None, -1.0) if none exist
+    """
+    latest_file = None
+    latest_mtime = -1.0
+    with os.scandir(CACHE_DIR) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith(prefix) and name.endswith(suffix) and entry.is_file():
+                mtime = entry.stat().st_mtime
+                if mtime > latest_mtime:
+                    latest_file, latest_mtime = entry.path, mtime
+    return latest_file, latest_mtime
+
+def _stat_cache(path, fallback_prefix):
+    """
+    Stat the API cache file, falling back to the newest JSON file the standalone
+    scrapers saved into CACHE_DIR when the API has not written its own cache yet
+    
+    Returns:
+        tuple: (path, mtime), or (None, -1.0) if no cache exists
+    """
+    try:
+        return path, os.stat(path).st_mtime
+    except FileNotFoundError:
+        pass
+    
+    # Reuse a recent directory scan; new scraper output is picked up on the next rescan
+    scanned = _LATEST_SCANS.get(fallback_prefix)
+    if scanned is not None and time.monotonic() - scanned[2] < CACHE_RECHECK_SECONDS:
+        return scanned[0], scanned[1]
+    latest_file, latest_mtime = _find_latest_cache(fallback_prefix)
+    _LATEST_SCANS[fallback_prefix] = (latest_file, latest_mtime, time.monotonic())
+    return latest_file, latest_mtime
+
+def _read_cache_bytes(path):
+    """Return the JSON bytes of a plain or zstd-compressed cache file"""
+    with open(path, 'rb') as f:
+        if path.endswith(".zst"):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return zstandard.ZstdDecompressor().decompress(mm)
+        return f.read()
+
+def _read_cache(path):
+    """Read a plain or zstd-compressed cache file and return its list of records"""
+    # Map the file instead of reading it so the parser works on the page cache directly
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if path.endswith(".zst"):
+            file_data = orjson.loads(zstandard.ZstdDecompressor().decompress(mm))
+        else:
+            with memoryview(mm) as view:
+                file_data = orjson.loads(view)
+    if isinstance(file_data, dict) and 'data' in file_data:
+        return file_data['data']
+    return file_data
+
+def _write_cache(path, records, fields):
+    """
+    Write records to a zstd-compressed cache file, replacing it atomically
+    
+    The compact {"metadata": ..., "data": [...]} layout lets _read_passthrough
+    slice the record array out of the file without parsing it.
+    
+    Returns:
+        tuple: (path, mtime) of the written file
+    """
+    now = datetime.now()
+    timestamp = now.strftime("%Y%m%d_%H%M%S")
+    body = orjson.dumps({
+        "metadata": {
+            "extracted_at": now.isoformat(),
+            "timestamp": timestamp,
+            "total_records": len(records),
+            "fields": fields
+        },
+        "data": records
+    })
+    # A unique temporary name per write, so a background refresh and an inline
+    # scrape saving the same dataset never write into each other's file
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(zstandard.ZstdCompressor(level=3).compress(body))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path, os.stat(path).st_mtime
+
+# The root response never changes, so it is encoded once at import
+_ROOT_BODY = orjson.dumps({
+    "message": "MyGAP Data Scraper API",
+    "version": "1.0.0",
+    "endpoints": {
+        "/mygap/data/pf": "Fetch MyGAP Plant & Fresh certification data",
+        "/mygap/data/am": "Fetch MyGAP Apiary Management certification data",
+        "/mygap/data/organic": "Fetch MyGAP Organic certification data",
+        "/mygap/data/tanaman": "Fetch MyGAP Tanaman certification data",
+        "/mygap/data/{kind}/raw": "Fetch cached data for pf, am, organic or tanaman without re-encoding it",
+        "/mygap/stats": "Get statistics about the data",
+        "/docs": "API documentation (Swagger UI)",
+        "/redoc": "API documentation (ReDoc)"
+    }
+})
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "MyGAP Data Scraper API",
-        "version": "1.0.0",
-        "endpoints": {
-            "/mygap/data/pf": "Fetch MyGAP Plant & Fresh certification data",
-            "/mygap/data/am": "Fetch MyGAP Apiary Management certification data",
-            "/mygap/data/organic": "Fetch MyGAP Organic certification data",
-            "/mygap/data/tanaman": "Fetch MyGAP Tanaman certification data",
-            "/mygap/stats": "Get statistics about the data",
-            "/docs": "API documentation (Swagger UI)",
-            "/redoc": "API documentation (ReDoc)"
-        }
+    return Response(_ROOT_BODY, media_type="application/json")
+
+async def _refresh_cache_file(kind):
+    """Scrape a dataset and replace its cache file, then have the next request rebuild from it"""
+    source = _SOURCES[kind]
+    label = source["label"]
+    cached = _DATASET_CACHE[kind]
+    try:
+        raw_data = await run_in_threadpool(_scrape, kind)
+        if not raw_data:
+            logger.warning("Background %s refresh returned no data, keeping the old cache file", label)
+            return
+        await run_in_threadpool(_write_cache, source["cache_file"], raw_data, source["fields"])
+        cached["checked_at"] = 0.0
+        logger.info("Background %s refresh saved %s records", label, len(raw_data))
+    except Exception as e:
+        logger.error("Background %s refresh failed: %s", label, e)
+
+def _stale_kinds():
+    """
+    List the datasets whose cache file exists but is older than 1 day.
+    Datasets that were never cached are left alone until first requested
+    """
+    now = time.time()
+    stale = []
+    for kind, source in _SOURCES.items():
+        latest_file, latest_mtime = _stat_cache(source["cache_file"], source["fallback_prefix"])
+        if latest_file and now - latest_mtime >= FRESH_SECONDS:
+            stale.append(kind)
+    return stale
+
+async def _start_stale_refreshes():
+    """
+    Start background refreshes of every stale dataset, not just the one that
+    was requested, so the scrapes run side by side in worker threads and the
+    sibling endpoints find fresh files. A dataset already refreshing is skipped
+    """
+    for kind in await run_in_threadpool(_stale_kinds):
+        task = _REFRESH_TASKS.get(kind)
+        if task is None or task.done():
+            _REFRESH_TASKS[kind] = asyncio.create_task(_refresh_cache_file(kind))
+
+def _build_pf_bodies(raw_data, data_source):
+    """
+    Encode the PF data and stats responses for raw_data. This is CPU-bound, so
+    _load_dataset runs it in a worker thread rather than on the event loop
+    
+    Returns:
+        tuple: (message, {"body": ..., "stats_body": ...}), both bodies split by _split_at_timestamp
+    """
+    # The records already follow the MyGAPRecord_PF schema, so serialize them
+    # as-is instead of round-tripping every item through Pydantic
+    message = f"Successfully loaded {len(raw_data)} MyGAP PF certification records from {data_source}"
+    body = orjson.dumps({
+        "success": True,
+        "message": message,
+        "total_records": len(raw_data),
+        "timestamp": _TIMESTAMP_SLOT,
+        "data": raw_data
+    })
+    return message, {
+        "body": _split_at_timestamp(body),
+        "stats_body": _split_at_timestamp(_build_stats_body(raw_data)),
     }
 
-@app.get("/mygap/data/pf", response_model=MyGAPResponse_PF)
-async def get_mygap_pf_data():
+def _build_pf_bodies_from_file(kind, path):
+    """Read and encode the PF cache file, or return None if it holds no record list"""
+    raw_data = _read_cache(path)
+    if raw_data is None:
+        return None
+    return _build_pf_bodies(raw_data, "cache")
+
+def _build_pf_bodies_from_scrape(kind, raw_data):
+    """Encode freshly scraped PF records as they are"""
+    return _build_pf_bodies(raw_data, "fresh")
+
+def _build_dataset_body(kind, records, data_source):
     """
-    Fetch MyGAP certification data - reads from JSON file first, 
-    only fetches new data if file is older than 1 day
+    Encode the /mygap/data/{kind} response for validated records. Like the
+    validation before it, this runs in a worker thread off the event loop
     
     Returns:
-        MyGAPResponse: Complete dataset with all certification records
+        tuple: (message, {"body": ...}), the body split by _split_at_timestamp
     """
-    try:
-        # First try to read from existing JSON file
-        raw_data = None
-        data_source = "cache"
-        
-        # Find the most recent PF JSON file
-        json_files = glob.glob("mygap_data_pf_*.json")
-        if json_files:
-            # Sort by modification time, get the newest
-            latest_file = max(json_files, key=os.path.getmtime)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(latest_file))
-            file_age = datetime.now() - file_mtime
-            
-            logger.info(f"Found existing file: {latest_file}, age: {file_age}")
-            
-            # If file is less than 1 day old, read from it
-            if file_age < timedelta(days=1):
-                try:
-                    with open(latest_file, 'r', encoding='utf-8') as f:
-                        file_data = json.load(f)
-                        if isinstance(file_data, list):
-                            raw_data = file_data
-                        elif isinstance(file_data, dict) and 'data' in file_data:
-                            raw_data = file_data['data']
-                        else:
-                            raw_data = file_data
-                    logger.info(f"Successfully loaded {len(raw_data) if raw_data else 0} records from cache")
-                except Exception as e:
-                    logger.warning(f"Failed to read from cache file: {str(e)}")
-                    raw_data = None
-            else:
-                logger.info(f"File is older than 1 day ({file_age}), fetching fresh data")
-        
-        # If no valid cached data, extract from website
-        if raw_data is None:
-            logger.info("Fetching fresh data from MyGAP website...")
-            raw_data = extract_mygap_pf_data(save_to_file=True)  # Save fresh data to file
-            data_source = "fresh"
-            
-            if raw_data is None:
-                logger.error("Failed to extract data from MyGAP website")
-                raise HTTPException(
-                    status_code=500, 
-                    detail="Failed to extract data from MyGAP website. The website might be unavailable."
-                )
-        
-        # Convert raw data to Pydantic models
-        records = []
-        for item in raw_data:
-            record = MyGAPRecord_PF(**item)
-            records.append(record)
-        
-        message = f"Successfully loaded {len(records)} MyGAP PF certification records from {data_source}"
-        response = MyGAPResponse_PF(
-            success=True,
-            message=message,
-            total_records=len(records),
-            timestamp=datetime.now().isoformat(),
-            data=records
-        )
-        
-        logger.info(message)
-        return response
-        
-    except Exception as e:
-        logger.error(f"Error loading MyGAP data: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Internal server error: {str(e)}"
-        )
+    source = _SOURCES[kind]
+    message = f"Successfully loaded {len(records)} MyGAP {source['label']} certification records from {data_source}"
+    response = source["response_model"](
+        success=True,
+        message=message,
+        total_records=len(records),
+        timestamp=_TIMESTAMP_SLOT,
+        data=records
+    )
+    return message, {"body": _split_at_timestamp(response.model_dump_json().encode())}
+
+def _build_dataset_body_from_file(kind, path):
+    """Read, validate and encode a dataset cache file, parsing straight from its JSON bytes"""
+    records = _records_from_json(_SOURCES[kind]["cache_adapter"], _read_cache_bytes(path))
+    return _build_dataset_body(kind, records, "cache")
 
-@app.get("/mygap/data/am", response_model=MyGAPResponse_AM)
-async def get_mygap_am_data():
+def _build_dataset_body_from_scrape(kind, raw_data):
+    """Validate freshly scraped records in one pydantic-core call and encode them"""
+    records = _SOURCES[kind]["records_adapter"].validate_python(raw_data)
+    return _build_dataset_body(kind, records, "fresh")
+
+# How each dataset's cache file or fresh scrape becomes its cached bodies. PF
+# is served without validation and also carries the /mygap/stats body
+_SOURCES["pf"].update(
+    build_from_file=_build_pf_bodies_from_file,
+    build_from_scrape=_build_pf_bodies_from_scrape
+)
+for _kind in ("am", "organic", "tanaman"):
+    _SOURCES[_kind].update(
+        build_from_file=_build_dataset_body_from_file,
+        build_from_scrape=_build_dataset_body_from_scrape
+    )
+
+async def _load_dataset(kind):
     """
-    Fetch MyGAP AM (Apiary Management) certification data - reads from JSON file first, 
-    only fetches new data if file is older than 1 day
+    Make sure _DATASET_CACHE[kind] holds the serialized /mygap/data/{kind}
+    response - reads from the cache file first; a file older than 1 day is
+    still served while fresh data is fetched in the background, and the
+    website is only scraped inline when there is no usable file
+    
+    The bodies are kept in memory and served as-is until the cache file
+    changes, so repeated requests skip the disk read, validation and encoding.
     
     Returns:
-        MyGAPResponse: Complete dataset with all AM certification records
+        tuple: The dataset's encoded response, split by _split_at_timestamp
     """
-    try:
+    source = _SOURCES[kind]
+    label = source["label"]
+    cached = _DATASET_CACHE[kind]
+    
+    # Use the in-memory body without touching the disk if it was checked recently
+    if cached["body"] is not None and time.monotonic() - cached["checked_at"] < CACHE_RECHECK_SECONDS:
+        return cached["body"]
+    
+    # Only one request per dataset rebuilds the body; the others wait and reuse it
+    async with _DATASET_CACHE_LOCKS[kind]:
+        if cached["body"] is not None and time.monotonic() - cached["checked_at"] < CACHE_RECHECK_SECONDS:
+            return cached["body"]
+        
         # First try to read from existing JSON file
-        raw_data = None
-        data_source = "cache"
+        encoded = None
         
-        # Find the most recent AM JSON file
-        json_files = glob.glob("mygap_data_am_*.json")
-        if json_files:
-            # Sort by modification time, get the newest
-            latest_file = max(json_files, key=os.path.getmtime)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(latest_file))
-            file_age = datetime.now() - file_mtime
+        latest_file, latest_mtime = await run_in_threadpool(
+            _stat_cache, source["cache_file"], source["fallback_prefix"]
+        )
+        if latest_file:
+            file_age = time.time() - latest_mtime
             
-            logger.info(f"Found existing AM file: {latest_file}, age: {file_age}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Found existing %s file: %s, age: %s", label, latest_file, timedelta(seconds=file_age))
             
-            # If file is less than 1 day old, read from it
-            if file_age < timedelta(days=1):
+            # A file older than 1 day is still served while a background scrape replaces it
+            if file_age >= FRESH_SECONDS:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("%s file is older than 1 day (%s), serving it while fetching fresh data", label, timedelta(seconds=file_age))
+                await _start_stale_refreshes()
+            
+            # The file has not changed since the body was built, keep serving it
+            if cached["body"] is not None and cached["mtime"] == latest_mtime:
+                cached["checked_at"] = time.monotonic()
+                return cached["body"]
+            
+            try:
+                encoded = await run_in_threadpool(source["build_from_file"], kind, latest_file)
+            except Exception as e:
+                logger.warning("Failed to read from %s cache file: %s", label, e)
+                encoded = None
+        
+        # A stale file that failed to load has a background refresh scraping it
+        # already, so wait for that file instead of scraping a second time
+        refresh = _REFRESH_TASKS.get(kind)
+        if encoded is None and refresh is not None and not refresh.done():
+            logger.info("Waiting for the background %s refresh...", label)
+            await asyncio.shield(refresh)
+            latest_file, latest_mtime = await run_in_threadpool(
+                _stat_cache, source["cache_file"], source["fallback_prefix"]
+            )
+            if latest_file:
                 try:
-                    with open(latest_file, 'r', encoding='utf-8') as f:
-                        file_data = json.load(f)
-                        if isinstance(file_data, list):
-                            raw_data = file_data
-                        elif isinstance(file_data, dict) and 'data' in file_data:
-                            raw_data = file_data['data']
-                        else:
-                            raw_data = file_data
-                    logger.info(f"Successfully loaded {len(raw_data) if raw_data else 0} AM records from cache")
+                    encoded = await run_in_threadpool(source["build_from_file"], kind, latest_file)
                 except Exception as e:
-                    logger.warning(f"Failed to read from AM cache file: {str(e)}")
-                    raw_data = None
-            else:
-                logger.info(f"AM file is older than 1 day ({file_age}), fetching fresh data")
-        
-        # If no valid cached data, extract from website
-        if raw_data is None:
-            logger.info("Fetching fresh AM data from MyGAP website...")
-            raw_data = extract_mygap_am_data(save_to_file=True)  # Save fresh data to file
-            data_source = "fresh"
+                    logger.warning("Failed to read from refreshed %s cache file: %s", label, e)
+        
+        # If no valid cached data, extract from website. The scrape runs in a
+        # worker thread so the event loop keeps serving other endpoints, while
+        # the lock makes concurrent requests for this dataset wait for one scrape
+        if encoded is None:
+            logger.info("Fetching fresh %s data from MyGAP website...", label)
+            raw_data = await run_in_threadpool(_scrape, kind)
+            # Nothing new on disk yet, so the next recheck rebuilds from the file
+            latest_mtime = 0.0
             
             if raw_data is None:
-                logger.error("Failed to extract AM data from MyGAP website")
+                logger.error("Failed to extract %s data from MyGAP website", label)
                 raise HTTPException(
                     status_code=500, 
-                    detail="Failed to extract AM data from MyGAP website. The website might be unavailable."
+                    detail=f"Failed to extract {label} data from MyGAP website. The website might be unavailable."
                 )
+            
+            # Save fresh data to the compressed cache file
+            if raw_data:
+                latest_file, latest_mtime = await run_in_threadpool(
+                    _write_cache, source["cache_file"], raw_data, source["fields"]
+                )
+            
+            encoded = await run_in_threadpool(source["build_from_scrape"], kind, raw_data)
         
-        # Convert raw data to Pydantic models
-        records = []
-        for item in raw_data:
-            record = MyGAPRecord_AM(**item)
-            records.append(record)
-        
-        message = f"Successfully loaded {len(records)} MyGAP AM certification records from {data_source}"
-        response = MyGAPResponse_AM(
-            success=True,
-            message=message,
-            total_records=len(records),
-            timestamp=datetime.now().isoformat(),
-            data=records
-        )
+        message, bodies = encoded
+        cached.update(bodies)
+        cached["mtime"] = latest_mtime
+        cached["checked_at"] = time.monotonic()
         
         logger.info(message)
-        return response
+        return cached["body"]
+
+def _dataset_endpoint(kind):
+    """Build the /mygap/data/{kind} endpoint for one dataset"""
+    label = _SOURCES[kind]["label"]
+    
+    async def endpoint():
+        try:
+            body = await _load_dataset(kind)
+        except Exception as e:
+            logger.error("Error loading MyGAP %s data: %s", label, e)
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Internal server error: {str(e)}"
+            )
         
-    except Exception as e:
-        logger.error(f"Error loading MyGAP AM data: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Internal server error: {str(e)}"
-        )
+        return Response(_stamp(body), media_type="application/json")
+    
+    endpoint.__name__ = f"get_mygap_{kind}_data"
+    endpoint.__doc__ = f"""
+    Fetch MyGAP {label} certification data - reads from JSON file first, 
+    refreshing it in the background once it is older than 1 day
+    """
+    return endpoint
+
+get_mygap_pf_data = _dataset_endpoint("pf")
+get_mygap_am_data = _dataset_endpoint("am")
+get_mygap_organic_data = _dataset_endpoint("organic")
+get_mygap_tanaman_data = _dataset_endpoint("tanaman")
 
-@app.get("/mygap/data/organic", response_model=MyGAPResponse_Organic)
-async def get_mygap_organic_data():
+# Handlers by dataset, also used by /mygap/data/{kind}/raw when there is no fresh cache file
+_DATA_ENDPOINTS = {
+    "pf": get_mygap_pf_data,
+    "am": get_mygap_am_data,
+    "organic": get_mygap_organic_data,
+    "tanaman": get_mygap_tanaman_data,
+}
+
+for _kind, _endpoint in _DATA_ENDPOINTS.items():
+    app.add_api_route(
+        f"/mygap/data/{_kind}",
+        _endpoint,
+        methods=["GET"],
+        responses={200: {"model": _SOURCES[_kind]["response_model"]}}
+    )
+
+def _read_passthrough(path):
     """
-    Fetch MyGAP Organic certification data - reads from JSON file first, 
-    only fetches new data if file is older than 1 day
+    Read a cache file for passthrough serving
     
     Returns:
-        MyGAPResponse: Complete dataset with all Organic certification records
+        tuple: (record count, JSON bytes of the record array)
     """
-    try:
-        # First try to read from existing JSON file
-        raw_data = None
-        data_source = "cache"
-        
-        # Find the most recent Organic JSON file
-        json_files = glob.glob("myorganic_data_*.json")
-        if json_files:
-            # Sort by modification time, get the newest
-            latest_file = max(json_files, key=os.path.getmtime)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(latest_file))
-            file_age = datetime.now() - file_mtime
-            
-            logger.info(f"Found existing Organic file: {latest_file}, age: {file_age}")
-            
-            # If file is less than 1 day old, read from it
-            if file_age < timedelta(days=1):
-                try:
-                    with open(latest_file, 'r', encoding='utf-8') as f:
-                        file_data = json.load(f)
-                        if isinstance(file_data, list):
-                            raw_data = file_data
-                        elif isinstance(file_data, dict) and 'data' in file_data:
-                            raw_data = file_data['data']
-                        else:
-                            raw_data = file_data
-                    logger.info(f"Successfully loaded {len(raw_data) if raw_data else 0} Organic records from cache")
-                except Exception as e:
-                    logger.warning(f"Failed to read from Organic cache file: {str(e)}")
-                    raw_data = None
-            else:
-                logger.info(f"Organic file is older than 1 day ({file_age}), fetching fresh data")
-        
-        # If no valid cached data, extract from website
-        if raw_data is None:
-            logger.info("Fetching fresh Organic data from MyGAP website...")
-            raw_data = extract_mygap_organic_data(save_to_file=True)  # Save fresh data to file
-            data_source = "fresh"
-            
-            if raw_data is None:
-                logger.error("Failed to extract Organic data from MyGAP website")
-                raise HTTPException(
-                    status_code=500, 
-                    detail="Failed to extract Organic data from MyGAP website. The website might be unavailable."
-                )
-        
-        # Convert raw data to Pydantic models
-        records = []
-        for item in raw_data:
-            record = MyGAPRecord_Organic(**item)
-            records.append(record)
-        
-        message = f"Successfully loaded {len(records)} MyGAP Organic certification records from {data_source}"
-        response = MyGAPResponse_Organic(
-            success=True,
-            message=message,
-            total_records=len(records),
-            timestamp=datetime.now().isoformat(),
-            data=records
-        )
-        
-        logger.info(message)
-        return response
-        
-    except Exception as e:
-        logger.error(f"Error loading MyGAP Organic data: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Internal server error: {str(e)}"
-        )
+    raw_bytes = _read_cache_bytes(path)
+    prefix = b'{"metadata":'
+    split = raw_bytes.find(b',"data":')
+    if raw_bytes.startswith(prefix) and split > 0:
+        # Written by _write_cache: only the small metadata object is parsed and
+        # the record array is sliced out as-is
+        metadata = orjson.loads(raw_bytes[len(prefix):split])
+        view = memoryview(raw_bytes)
+        return metadata["total_records"], view[split + len(b',"data":'):-1]
+    # Any other layout (e.g. indented scraper output) is parsed and re-encoded
+    records = orjson.loads(raw_bytes)
+    if isinstance(records, dict) and 'data' in records:
+        records = records['data']
+    return len(records), orjson.dumps(records)
 
-@app.get("/mygap/data/tanaman", response_model=MyGAPResponse)
-async def get_mygap_tanaman_data():
+@app.get("/mygap/data/{kind}/raw")
+async def get_mygap_raw_data(kind: str):
     """
-    Fetch MyGAP Tanaman certification data - reads from JSON file first, 
-    only fetches new data if file is older than 1 day
+    Serve a fresh cache file as-is, wrapped in the usual response envelope,
+    without parsing or validating the records. Falls back to the regular
+    endpoint when there is no fresh cache file.
+    
+    The records are returned exactly as stored. /mygap/data/{kind} validates
+    them against the dataset's record model, so for am, organic and tanaman it
+    fills missing fields with null and drops unknown keys; the two responses
+    only match when the file was written by _write_cache from scraped records
+    (or for PF, which is never validated). Scraper output in the fallback
+    layout can therefore come back here with fewer or extra fields.
     
     Returns:
-        MyGAPResponse: Complete dataset with all Tanaman certification records
+        Response: The /mygap/data/{kind} envelope around the file's records as-is
     """
+    if kind not in _SOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {kind}")
+    source = _SOURCES[kind]
+    label = source["label"]
+    
     try:
-        # First try to read from existing JSON file
-        raw_data = None
-        data_source = "cache"
-        
-        # Find the most recent Tanaman JSON file
-        json_files = glob.glob("mygap_data_tanaman_*.json")
-        if json_files:
-            # Sort by modification time, get the newest
-            latest_file = max(json_files, key=os.path.getmtime)
-            file_mtime = datetime.fromtimestamp(os.path.getmtime(latest_file))
-            file_age = datetime.now() - file_mtime
-            
-            logger.info(f"Found existing Tanaman file: {latest_file}, age: {file_age}")
-            
-            # If file is less than 1 day old, read from it
-            if file_age < timedelta(days=1):
-                try:
-                    with open(latest_file, 'r', encoding='utf-8') as f:
-                        file_data = json.load(f)
-                        if isinstance(file_data, list):
-                            raw_data = file_data
-                        elif isinstance(file_data, dict) and 'data' in file_data:
-                            raw_data = file_data['data']
-                        else:
-                            raw_data = file_data
-                    logger.info(f"Successfully loaded {len(raw_data) if raw_data else 0} Tanaman records from cache")
-                except Exception as e:
-                    logger.warning(f"Failed to read from Tanaman cache file: {str(e)}")
-                    raw_data = None
-            else:
-                logger.info(f"Tanaman file is older than 1 day ({file_age}), fetching fresh data")
-        
-        # If no valid cached data, extract from website
-        if raw_data is None:
-            logger.info("Fetching fresh Tanaman data from MyGAP website...")
-            raw_data = extract_mygap_tanaman_data(save_to_file=True)  # Save fresh data to file
-            data_source = "fresh"
-            
-            if raw_data is None:
-                logger.error("Failed to extract Tanaman data from MyGAP website")
-                raise HTTPException(
-                    status_code=500, 
-                    detail="Failed to extract Tanaman data from MyGAP website. The website might be unavailable."
-                )
-        
-        # Convert raw data to Pydantic models
-        records = []
-        for item in raw_data:
-            record = MyGAPRecord(**item)
-            records.append(record)
-        
-        message = f"Successfully loaded {len(records)} MyGAP Tanaman certification records from {data_source}"
-        response = MyGAPResponse(
-            success=True,
-            message=message,
-            total_records=len(records),
-            timestamp=datetime.now().isoformat(),
-            data=records
+        latest_file, latest_mtime = await run_in_threadpool(
+            _stat_cache, source["cache_file"], source["fallback_prefix"]
         )
-        
-        logger.info(message)
-        return response
-        
+        if latest_file and time.time() - latest_mtime < FRESH_SECONDS:
+            total_records, data = await run_in_threadpool(_read_passthrough, latest_file)
+            head = orjson.dumps({
+                "success": True,
+                "message": f"Successfully loaded {total_records} MyGAP {label} certification records from cache",
+                "total_records": total_records,
+                "timestamp": _timestamp()
+            })
+            # Reopen the envelope object and append the untouched record array
+            return Response(b"".join((head[:-1], b',"data":', data, b"}")), media_type="application/json")
     except Exception as e:
-        logger.error(f"Error loading MyGAP Tanaman data: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Internal server error: {str(e)}"
-        )
+        logger.warning("Failed to serve %s cache file as-is: %s", label, e)
+    
+    return await _DATA_ENDPOINTS[kind]()
 
-@app.get("/mygap/stats", response_model=StatsResponse)
+def _to_columns(records, fields):
+    """Transpose a list of record dicts into one list of values per field"""
+    return {field: [record.get(field) or '' for record in records] for field in fields}
+
+def _count_completed(columns):
+    """Count the non-blank values in each column"""
+    return {field: sum(map(bool, map(_has_content, values))) for field, values in columns.items()}
+
+def _build_stats_body(raw_data):
+    """
+    Serialize the StatsResponse for a dataset, with field completion rates and
+    _TIMESTAMP_SLOT in place of the timestamp
+    """
+    total_records = len(raw_data)
+    
+    # Count non-empty values column by column
+    columns = _to_columns(raw_data, _PF_STATS_FIELDS)
+    counts = _count_completed(columns)
+    
+    field_stats = []
+    for field, completed_count in counts.items():
+        completion_percentage = (completed_count / total_records * 100) if total_records > 0 else 0
+        field_stats.append({
+            "field_name": field,
+            "completed_count": completed_count,
+            "total_count": total_records,
+            "completion_percentage": round(completion_percentage, 1)
+        })
+    
+    return orjson.dumps({
+        "success": True,
+        "message": f"Statistics for {total_records} MyGAP certification records",
+        "total_records": total_records,
+        "timestamp": _TIMESTAMP_SLOT,
+        "field_statistics": field_stats
+    })
+
+@app.get("/mygap/stats", responses={200: {"model": StatsResponse}})
 async def get_mygap_stats():
     """
     Get statistics about the MyGAP data including field completion rates
     
+    The statistics are computed once whenever the PF dataset is (re)loaded
+    and served from the same in-memory cache as /mygap/data/pf.
+    
     Returns:
         StatsResponse: Statistics about data completeness and field completion rates
     """
     try:
-        logger.info("Extracting MyGAP data for statistics...")
-        
-        # Extract data using our scraping function
-        raw_data = extract_mygap_pf_data(save_to_file=False)
-        
-        if raw_data is None:
-            logger.error("Failed to extract data from MyGAP website")
-            raise HTTPException(
-                status_code=500, 
-                detail="Failed to extract data from MyGAP website. The website might be unavailable."
-            )
-        
-        # Calculate field statistics
-        field_stats = []
-        total_records = len(raw_data)
-        
-        for field in PF_DATA_FIELDS:
-            completed_count = sum(1 for record in raw_data if record.get(field, '').strip())
-            completion_percentage = (completed_count / total_records * 100) if total_records > 0 else 0
-            
-            stat = FieldStats(
-                field_name=field,
-                completed_count=completed_count,
-                total_count=total_records,
-                completion_percentage=round(completion_percentage, 1)
-            )
-            field_stats.append(stat)
-        
-        response = StatsResponse(
-            success=True,
-            message=f"Statistics for {total_records} MyGAP certification records",
-            total_records=total_records,
-            timestamp=datetime.now().isoformat(),
-            field_statistics=field_stats
-        )
-        
-        logger.info(f"Generated statistics for {total_records} records")
-        return response
-        
+        await _load_dataset("pf")
     except Exception as e:
-        logger.error(f"Error generating MyGAP statistics: {str(e)}")
+        logger.error("Error generating MyGAP statistics: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"Internal server error: {str(e)}"
         )
+    
+    return Response(_stamp(_DATASET_CACHE["pf"]["stats_body"]), media_type="application/json")
+
+# Records encoded per streamed chunk. StreamingResponse iterates a plain
+# generator in the threadpool, so one record per chunk costs a thread hop each
+DOWNLOAD_CHUNK_RECORDS = 1000
+
+def _iter_json_download(metadata, records):
+    """Yield a {"metadata": ..., "data": [...]} document DOWNLOAD_CHUNK_RECORDS records at a time"""
+    yield b'{"metadata":' + orjson.dumps(metadata) + b',"data":['
+    separator = b''
+    for start in range(0, len(records), DOWNLOAD_CHUNK_RECORDS):
+        # Encode the slice as an array and drop its brackets to get comma-joined records
+        yield separator + orjson.dumps(records[start:start + DOWNLOAD_CHUNK_RECORDS])[1:-1]
+        separator = b','
+    yield b']}'
 
 @app.get("/mygap/download/json")
 async def download_json():
@@ -533,13 +823,13 @@ async def download_json():
     Download MyGAP data as JSON file
     
     Returns:
-        JSONResponse: Raw JSON data for download
+        StreamingResponse: Raw JSON data for download, encoded record by record
     """
     try:
         logger.info("Preparing JSON download...")
         
         # Extract data
-        raw_data = extract_mygap_pf_data(save_to_file=False)
+        raw_data = await run_in_threadpool(_scrape, "pf")
         
         if raw_data is None:
             raise HTTPException(
@@ -551,23 +841,22 @@ async def download_json():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"mygap_data_{timestamp}.json"
         
-        return JSONResponse(
-            content={
-                "metadata": {
-                    "extracted_at": datetime.now().isoformat(),
-                    "total_records": len(raw_data),
-                    "fields": PF_DATA_FIELDS
-                },
-                "data": raw_data
-            },
+        metadata = {
+            "extracted_at": _timestamp(),
+            "total_records": len(raw_data),
+            "fields": _SOURCES["pf"]["fields"]
+        }
+        
+        return StreamingResponse(
+            _iter_json_download(metadata, raw_data),
+            media_type="application/json",
             headers={
-                "Content-Disposition": f"attachment; filename={filename}",
-                "Content-Type": "application/json"
+                "Content-Disposition": f"attachment; filename={filename}"
             }
         )
         
     except Exception as e:
-        logger.error(f"Error preparing JSON download: {str(e)}")
+        logger.error("Error preparing JSON download: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"Internal server error: {str(e)}"
@@ -576,11 +865,11 @@ async def download_json():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
+    return Response(orjson.dumps({
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _timestamp(),
         "service": "MyGAP Data Scraper API"
-    }
+    }), media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,542 @@
+import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+import lxml.etree
+import lxml.html
+import contextlib
+import codecs
+import csv
+import io
+import orjson
+from datetime import datetime
+import re
+from urllib.parse import urljoin
+import html
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Per-record progress (each dialog fetch and update) is logged at DEBUG; phase
+# summaries are printed as before. Use logging.basicConfig(level=logging.DEBUG)
+# to see everything
+logger = logging.getLogger(__name__)
+
+# Site that serves all MyGAP / myOrganic certification lists and their dialogs
+BASE_URL = 'https://carianmygapmyorganic.doa.gov.my/'
+
+# Concurrent "More ..." dialog fetches, and the connection pool sized to them
+# so no worker ever waits for a free connection
+DIALOG_WORKERS = 16
+
+def pool_size_for(dialog_workers):
+    """Connection pool size for a session shared by dialog_workers fetch threads"""
+    return max(20, dialog_workers * 2)
+
+POOL_SIZE = pool_size_for(DIALOG_WORKERS)
+
+# (connect, read) timeout in seconds for each dialog request
+DIALOG_TIMEOUT = (3.05, 10)
+
+# (connect, read) timeout for any request made without one, so a stalled server
+# can't hang a scraper. The read limit is generous for the pagesize=-1 list pages
+DEFAULT_TIMEOUT = (3.05, 60)
+
+# Standalone runs save into the API's cache directory (same MYGAP_CACHE_DIR
+# override), where the API falls back to the newest JSON file
+OUTPUT_DIR = os.environ.get("MYGAP_CACHE_DIR", "cache")
+
+# "More ..." dialog responses are cached on disk between runs, next to the
+# scraped data. List pages are always fetched live so they can be streamed
+# (see extract_table)
+HTTP_CACHE_NAME = os.path.join(OUTPUT_DIR, 'mygap_http_cache')
+HTTP_CACHE_SECONDS = 3600
+
+# Bytes of the list page fed to the parser at a time while it streams in
+STREAM_CHUNK_BYTES = 65536
+
+# Clean-up patterns for dialog and cell text, compiled once at import
+_BR_TAGS = ('<br>', '<br/>', '<br />')
+_BR_RE = re.compile(r'<br\s*/?>')
+_TAG_RE = re.compile(r'<[^>]+>')
+_DUP_COMMA_RE = re.compile(r',\s*,')
+_TRAIL_COMMA_RE = re.compile(r',\s*$')
+_MORE_SUFFIX_RE = re.compile(r'More\s*\.+$')
+
+# "More ..." dialog link inside a truncated cell, compiled once for every row
+_MORE_LINK_XPATH = lxml.etree.XPath('.//a[contains(@data-query, "fulltext.php")]')
+
+def element_text(element):
+    """Text of an element with each text node stripped, like BeautifulSoup's get_text(strip=True)"""
+    return ''.join(text.strip() for text in element.itertext())
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default (connect, read) timeout to requests sent without one"""
+    
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+    
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+def configure_session(session, pool_size=POOL_SIZE):
+    """Mount a pooled, retrying HTTP adapter and browser-like default headers on a session"""
+    # Configure retry strategy: exponential backoff with jitter so parallel
+    # dialog workers don't retry in lockstep, and honour Retry-After on 429/503
+    retry_strategy = Retry(
+        total=5,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        backoff_max=15,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET", "OPTIONS"],
+        respect_retry_after_header=True
+    )
+    
+    # Configure HTTP adapter with connection pooling
+    adapter = TimeoutHTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=pool_size,  # Number of connection pools to cache
+        pool_maxsize=pool_size,      # Maximum number of connections to save in pool
+        pool_block=True              # Block when no free connections available
+    )
+    
+    # Mount adapter for both HTTP and HTTPS
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    
+    # Set common headers to appear more like a regular browser
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        # Compressed encodings urllib3 can decode here (adds br/zstd when brotli/zstandard are installed)
+        'Accept-Encoding': ACCEPT_ENCODING,
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    })
+    
+    return session
+
+def create_pooled_session(pool_size=POOL_SIZE):
+    """Create a plain session with connection pooling and retry strategy"""
+    return configure_session(requests.Session(), pool_size)
+
+def create_optimized_session(pool_size=POOL_SIZE):
+    """Create an optimized session with an on-disk response cache, connection pooling and retry strategy"""
+    return configure_session(requests_cache.CachedSession(
+        HTTP_CACHE_NAME,
+        backend='sqlite',
+        expire_after=HTTP_CACHE_SECONDS,
+        allowable_methods=('GET',)
+    ), pool_size)
+
+def batch_fetch_full_content(session, dialog_requests, base_url, max_workers=5):
+    """Fetch multiple dialog contents in parallel with controlled concurrency"""
+    results = {}
+    
+    def fetch_single_dialog(url):
+        """Helper function for threading"""
+        try:
+            return get_full_text_from_dialog(session, url, base_url)
+        except Exception as e:
+            print(f"  Error in batch fetch for {url}: {str(e)}")
+            return None
+    
+    if not dialog_requests:
+        return results
+    
+    # Rows often share the same truncated text, so fetch each dialog URL once
+    # and hand its content to every (row, field) that asked for it
+    targets_by_url = {}
+    for field, url, row_index in dialog_requests:
+        targets_by_url.setdefault(url, []).append((row_index, field))
+    
+    print(f"  Batch fetching {len(targets_by_url)} unique dialog contents "
+          f"for {len(dialog_requests)} fields with {max_workers} workers...")
+    
+    # Use ThreadPoolExecutor for controlled parallel requests
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Submit all requests
+        future_to_url = {
+            executor.submit(fetch_single_dialog, url): url
+            for url in targets_by_url
+        }
+        
+        # Collect results as they complete; each request is bounded by its own HTTP timeout
+        for future in as_completed(future_to_url):
+            url = future_to_url[future]
+            try:
+                content = future.result()
+                if content:
+                    for row_index, field in targets_by_url[url]:
+                        if row_index not in results:
+                            results[row_index] = {}
+                        results[row_index][field] = content
+            except Exception as e:
+                print(f"  Batch request failed for {url}: {str(e)}")
+    
+    print(f"  Batch fetch completed. Retrieved {len(results)} full contents.")
+    return results
+
+def _declared_charset(response):
+    """Charset named in the response's Content-Type header, or None if it names none"""
+    content_type = response.headers.get('Content-Type', '')
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            return value.strip().strip('"\'') or None
+    return None
+
+def _response_encoding(response):
+    """
+    Encoding to decode or parse a response body with: the Content-Type charset
+    when it names one Python knows, otherwise UTF-8. lxml on its own would
+    ignore the header and fall back to Latin-1 for pages without <meta charset>
+    """
+    charset = _declared_charset(response)
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:  # Unknown charset name
+            pass
+    return 'utf-8'
+
+def get_full_text_from_dialog(session, more_link_url, base_url):
+    """Extract full text from the dialog modal when 'More ...' is clicked"""
+    try:
+        # Construct the full URL for the dialog content
+        if more_link_url.startswith('fulltext.php'):
+            full_url = urljoin(base_url, more_link_url)
+        else:
+            full_url = more_link_url
+            
+        logger.debug("Fetching full content from: %s", full_url)
+        
+        # Removed unnecessary delay - using persistent session instead
+        
+        response = session.get(full_url, timeout=DIALOG_TIMEOUT)
+        if response.status_code == 200:
+            try:
+                # The response is HTML-encoded JSON format: {"success":true,"textCont":"FULL_CONTENT"}
+                # First decode HTML entities. The body is UTF-8 unless Content-Type names
+                # a charset; requests would otherwise assume ISO-8859-1 for text/html
+                text = response.content.decode(_response_encoding(response), errors='replace')
+                decoded_content = html.unescape(text)
+                json_response = orjson.loads(decoded_content)
+                if json_response.get('success') and 'textCont' in json_response:
+                    content = json_response['textCont']
+                    # Clean up HTML tags and entities
+                    for br in _BR_TAGS:                         # Replace <br> with commas
+                        content = content.replace(br, ', ')
+                    if '<br' in content:                        # Rarer spellings like <br  />
+                        content = _BR_RE.sub(', ', content)
+                    content = _TAG_RE.sub('', content)          # Remove any other HTML tags
+                    content = content.replace('\\n', ', ').replace('\n', ', ')  # Replace newlines
+                    content = _DUP_COMMA_RE.sub(',', content)   # Remove duplicate commas
+                    content = _TRAIL_COMMA_RE.sub('', content)  # Remove trailing comma
+                    content = content.strip()
+                    return content
+                else:
+                    print(f"  Unexpected JSON structure: {json_response}")
+                    return None
+            except orjson.JSONDecodeError:
+                # Fallback to HTML parsing if not JSON
+                dialog_doc = lxml.html.fromstring(
+                    response.content, parser=lxml.html.HTMLParser(encoding=_response_encoding(response))
+                )
+                modal_body = dialog_doc.xpath('//div[contains(concat(" ", normalize-space(@class), " "), " modal-body ")]')
+                if modal_body:
+                    return element_text(modal_body[0])
+                else:
+                    body_text = element_text(dialog_doc)
+                    return body_text
+        else:
+            print(f"  Failed to fetch dialog content: {response.status_code}")
+            return None
+            
+    except Exception as e:
+        print(f"  Error fetching dialog content: {str(e)}")
+        return None
+
+def _iter_table_rows(response, first_field):
+    """
+    Stream a list page into lxml and yield the rows of the table holding the
+    data-field=first_field header, each one as soon as it has been parsed
+    
+    Rows are cleared (and their parsed siblings dropped) once the caller moves
+    on, so only about one row of the table is held in memory at a time. Raises
+    LookupError if the header or its table is not on the page.
+    """
+    parser = lxml.etree.HTMLPullParser(
+        events=('end',), tag=('th', 'tr'), encoding=_response_encoding(response)
+    )
+    
+    def events():
+        for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+            parser.feed(chunk)
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+    
+    table = None
+    for _, elem in events():
+        if table is None:
+            # Find the table by looking for the first data field
+            if elem.tag == 'th' and elem.get('data-field') == first_field:
+                table = next(elem.iterancestors('table'), None)
+                if table is None:
+                    raise LookupError("Could not find parent table")
+            continue
+        
+        # Skip rows of tables nested inside the target table
+        if elem.tag != 'tr' or next(elem.iterancestors('table'), None) is not table:
+            continue
+        
+        yield elem
+        
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    
+    if table is None:
+        raise LookupError(f"Header with data-field='{first_field}' not found")
+
+def extract_table(url, fields, session=None, resolve_more=False, field_counts=None,
+                  dialog_workers=DIALOG_WORKERS, cached=False):
+    """
+    Extract the records of a MyGAP certification table
+    
+    Args:
+        url: List page holding the table
+        fields: data-field names to extract, in record key order
+        session: Session to fetch with; a pooled session is opened and
+            closed around the call if None
+        resolve_more: Replace truncated "More ..." cells with the full text
+            from their dialogs (needs a session)
+        field_counts: Optional dict incremented with the number of returned
+            records that have a non-empty value for each field
+        dialog_workers: Threads fetching "More ..." dialogs; with resolve_more
+            the session's pool must hold at least this many connections
+        cached: When no session is given, open a create_optimized_session so
+            dialog responses are kept in the HTTP cache between runs
+    
+    Returns:
+        list: One dict per table row with data, or None if the page or table
+        could not be read
+    
+    Raises:
+        ValueError: resolve_more is set and the session's connection pool is
+            smaller than dialog_workers
+    """
+    if session is None:
+        open_session = create_optimized_session if cached else create_pooled_session
+        with open_session(pool_size_for(dialog_workers)) as session:
+            return extract_table(url, fields, session, resolve_more, field_counts, dialog_workers)
+    
+    # Dialog workers share the session and each needs its own pooled connection,
+    # so reject an undersized session before any scraping is done
+    if resolve_more:
+        pool_size = session.get_adapter(BASE_URL).poolmanager.connection_pool_kw.get('maxsize', 1)
+        if pool_size < dialog_workers:
+            raise ValueError(
+                f"Session pool holds {pool_size} connections but dialog_workers is {dialog_workers}; "
+                "create the session with pool_size_for(dialog_workers)"
+            )
+    
+    # requests-cache reads and stores the whole body before returning a response,
+    # which would undo the streaming below, so the list page bypasses the cache
+    if isinstance(session, requests_cache.CachedSession):
+        fetch_context = session.cache_disabled()
+    else:
+        fetch_context = contextlib.nullcontext()
+    
+    with fetch_context, session.get(url, stream=True) as response:
+        if response.status_code != 200:
+            print(f"Error fetching page: {response.status_code}")
+            return None
+        
+        try:
+            rows = _iter_table_rows(response, fields[0])
+            
+            # Find the header row and map field names to column indices
+            field_to_col_map = {}
+            
+            for row in rows:
+                temp_map = {}
+                
+                for j, header in enumerate(row.iter('th', 'td')):
+                    data_field = header.get('data-field')
+                    if data_field in fields:
+                        temp_map[data_field] = j
+                
+                # If we found at least one of our target fields, this is likely the header row
+                if temp_map:
+                    field_to_col_map = temp_map
+                    break
+            
+            if not field_to_col_map:
+                print("Could not find any target data fields in table headers")
+                return None
+            
+            print("Table found. Extracting data...")
+            print(f"Found {len(field_to_col_map)} data fields:")
+            for field in field_to_col_map:
+                print(f"  - {field}")
+            
+            # Column index of each mapped field, in fields order, resolved once for all rows
+            field_columns = [(field, field_to_col_map[field]) for field in fields if field in field_to_col_map]
+            last_column = max(field_to_col_map.values())
+            
+            # Phase 1: Extract basic data and collect "More..." requests
+            extracted_data = []
+            dialog_requests = []  # [(field, url, row_index), ...]
+            
+            if resolve_more:
+                print("Phase 1: Extracting basic data and identifying truncated fields...")
+            
+            # The remaining rows are parsed as the page streams in
+            for row in rows:
+                cells = list(row.iter('th', 'td'))
+                if len(cells) == 0:
+                    continue
+                
+                # Every field defaults to empty; mapped columns are filled in below
+                row_data = dict.fromkeys(fields, "")
+                filled_fields = []
+                
+                # Full rows take every mapped column; only short rows are filtered by length
+                if len(cells) > last_column:
+                    row_columns = field_columns
+                else:
+                    row_columns = [(field, col_index) for field, col_index in field_columns if col_index < len(cells)]
+                
+                # Extract data for each field we're interested in
+                for field, col_index in row_columns:
+                    cell = cells[col_index]
+                    cell_data = element_text(cell)
+                    
+                    # Check if this cell contains a "More ..." link for truncated content
+                    if resolve_more and 'More' in cell_data and '...' in cell_data:
+                        # Look for the "More ..." link in the cell with data-query attribute
+                        more_links = _MORE_LINK_XPATH(cell)
+                        if more_links:
+                            # Extract the URL from data-query attribute or href
+                            query_url = more_links[0].get('data-query') or more_links[0].get('href')
+                            if query_url and query_url != 'javascript:void(0);':
+                                # Add to batch requests instead of fetching immediately. The cell
+                                # has data, so this row is appended at index len(extracted_data)
+                                dialog_requests.append((field, query_url, len(extracted_data)))
+                        else:
+                            # Try to clean up the "More ..." suffix for better data quality
+                            cell_data = _MORE_SUFFIX_RE.sub('', cell_data).strip()
+                            if cell_data.endswith(','):
+                                cell_data = cell_data[:-1].strip()
+                    
+                    row_data[field] = cell_data
+                    if cell_data:  # Check if there's actual data
+                        filled_fields.append(field)
+                
+                # Only add rows that have at least some data
+                if filled_fields:
+                    extracted_data.append(row_data)
+                    # Dialog text only ever replaces non-empty cells, so these counts stay exact
+                    if field_counts is not None:
+                        for field in filled_fields:
+                            field_counts[field] = field_counts.get(field, 0) + 1
+        except LookupError as e:
+            print(e)
+            return None
+    
+    if resolve_more:
+        print(f"Phase 1 complete: {len(extracted_data)} records, {len(dialog_requests)} truncated fields found")
+    
+    # Phase 2: Batch fetch all "More..." content
+    if dialog_requests:
+        print("Phase 2: Batch fetching truncated content...")
+        batch_results = batch_fetch_full_content(session, dialog_requests, BASE_URL, max_workers=dialog_workers)
+        
+        # Phase 3: Update extracted data with full content
+        print("Phase 3: Integrating full content into extracted data...")
+        for row_index, field_contents in batch_results.items():
+            if row_index < len(extracted_data):
+                for field, full_content in field_contents.items():
+                    if full_content:
+                        extracted_data[row_index][field] = full_content
+                        logger.debug("Updated %s for record %d", field, row_index + 1)
+    
+    print(f"\nExtracted {len(extracted_data)} records")
+    
+    return extracted_data
+
+def save_records(data, fields, prefix, format='both', metadata=True):
+    """
+    Save extracted records to prefix_<timestamp>.csv and/or .json files in OUTPUT_DIR
+    
+    With metadata=False the JSON file is just the record array instead of a
+    {"metadata": ..., "data": [...]} document; the API reads both layouts.
+    """
+    if not data:
+        print("No data to save")
+        return
+    
+    now = datetime.now()
+    timestamp = now.strftime("%Y%m%d_%H%M%S")
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    if format in ['csv', 'both']:
+        csv_filename = os.path.join(OUTPUT_DIR, f"{prefix}_{timestamp}.csv")
+        # Build the whole file in memory and write it in one call
+        buffer = io.StringIO(newline='')
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        writer.writerows([record.get(field, "") for field in fields] for record in data)
+        with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+            csvfile.write(buffer.getvalue())
+        print(f"Data saved to {csv_filename}")
+    
+    if format in ['json', 'both']:
+        json_filename = os.path.join(OUTPUT_DIR, f"{prefix}_{timestamp}.json")
+        
+        if metadata:
+            # Create structured JSON with metadata
+            json_data = {
+                "metadata": {
+                    "extracted_at": now.isoformat(),
+                    "timestamp": timestamp,
+                    "total_records": len(data),
+                    "fields": fields
+                },
+                "data": data
+            }
+        else:
+            json_data = data
+        
+        # Write beside the target and rename, so the API never reads a half-written file
+        tmp_filename = json_filename + ".tmp"
+        with open(tmp_filename, 'wb') as jsonfile:
+            jsonfile.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_filename, json_filename)
+        print(f"Data saved to {json_filename}")
+
+def display_sample_data(data, num_samples=5):
+    """Display a sample of the extracted data"""
+    if not data:
+        print("No data to display")
+        return
+    
+    print(f"\nDisplaying first {min(num_samples, len(data))} records:")
+    print("-" * 80)
+    
+    for i, record in enumerate(data[:num_samples], 1):
+        print(f"\nRecord {i}:")
+        for field, value in record.items():
+            if value:  # Only show fields with data
+                print(f"  {field}: {value}")
+    
+    if len(data) > num_samples:
+        print(f"\n... and {len(data) - num_samples} more records")
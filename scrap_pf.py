@@ -1,16 +1,4 @@
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
-import csv
-import json
-from datetime import datetime
-import time
-import re
-from urllib.parse import urljoin, parse_qs, urlparse
-import html
-from concurrent.futures import ThreadPoolExecutor
-import threading
+from scrap_common import BASE_URL, DIALOG_WORKERS, display_sample_data, extract_table, save_records
 
 # Define the data fields we want to extract
 DATA_FIELDS = [
@@ -28,267 +16,17 @@ DATA_FIELDS = [
     'tempoh_sah_laku'     # Expiry Date
 ]
 
-def create_optimized_session():
-    """Create an optimized session with connection pooling and retry strategy"""
-    session = requests.Session()
-    
-    # Configure retry strategy
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=0.3,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
-    )
-    
-    # Configure HTTP adapter with connection pooling
-    adapter = HTTPAdapter(
-        max_retries=retry_strategy,
-        pool_connections=10,  # Number of connection pools to cache
-        pool_maxsize=20,      # Maximum number of connections to save in pool
-        pool_block=True       # Block when no free connections available
-    )
-    
-    # Mount adapter for both HTTP and HTTPS
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    
-    # Set common headers to appear more like a regular browser
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    })
-    
-    return session
-
-def batch_fetch_full_content(session, dialog_requests, base_url, max_workers=5):
-    """Fetch multiple dialog contents in parallel with controlled concurrency"""
-    results = {}
-    
-    def fetch_single_dialog(request_info):
-        """Helper function for threading"""
-        field, url, row_index = request_info
-        try:
-            content = get_full_text_from_dialog(session, url, base_url)
-            return (row_index, field, content)
-        except Exception as e:
-            print(f"  Error in batch fetch for {field}: {str(e)}")
-            return (row_index, field, None)
-    
-    if not dialog_requests:
-        return results
-    
-    print(f"  Batch fetching {len(dialog_requests)} dialog contents with {max_workers} workers...")
-    
-    # Use ThreadPoolExecutor for controlled parallel requests
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all requests
-        future_to_request = {
-            executor.submit(fetch_single_dialog, req): req 
-            for req in dialog_requests
-        }
-        
-        # Collect results as they complete
-        for future in future_to_request:
-            try:
-                row_index, field, content = future.result(timeout=30)  # 30 second timeout per request
-                if content:
-                    if row_index not in results:
-                        results[row_index] = {}
-                    results[row_index][field] = content
-            except Exception as e:
-                request_info = future_to_request[future]
-                print(f"  Batch request failed for {request_info}: {str(e)}")
-    
-    print(f"  Batch fetch completed. Retrieved {len(results)} full contents.")
-    return results
-
-def get_full_text_from_dialog(session, more_link_url, base_url):
-    """Extract full text from the dialog modal when 'More ...' is clicked"""
-    try:
-        # Construct the full URL for the dialog content
-        if more_link_url.startswith('fulltext.php'):
-            full_url = urljoin(base_url, more_link_url)
-        else:
-            full_url = more_link_url
-            
-        print(f"  Fetching full content from: {full_url}")
-        
-        # Removed unnecessary delay - using persistent session instead
-        
-        response = session.get(full_url, timeout=10)  # Add timeout
-        if response.status_code == 200:
-            try:
-                # The response is HTML-encoded JSON format: {"success":true,"textCont":"FULL_CONTENT"}
-                # First decode HTML entities
-                decoded_content = html.unescape(response.text)
-                json_response = json.loads(decoded_content)
-                if json_response.get('success') and 'textCont' in json_response:
-                    content = json_response['textCont']
-                    # Clean up HTML tags and entities
-                    content = re.sub(r'<br\s*/?>', ', ', content)  # Replace <br> with commas
-                    content = re.sub(r'<[^>]+>', '', content)      # Remove any other HTML tags
-                    content = content.replace('\\n', ', ').replace('\n', ', ')  # Replace newlines
-                    content = re.sub(r',\s*,', ',', content)       # Remove duplicate commas
-                    content = re.sub(r',\s*$', '', content)        # Remove trailing comma
-                    content = content.strip()
-                    return content
-                else:
-                    print(f"  Unexpected JSON structure: {json_response}")
-                    return None
-            except json.JSONDecodeError:
-                # Fallback to HTML parsing if not JSON
-                dialog_soup = BeautifulSoup(response.content, 'html.parser')
-                modal_body = dialog_soup.find('div', class_='modal-body')
-                if modal_body:
-                    return modal_body.get_text(strip=True)
-                else:
-                    body_text = dialog_soup.get_text(strip=True)
-                    return body_text
-        else:
-            print(f"  Failed to fetch dialog content: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"  Error fetching dialog content: {str(e)}")
-        return None
-
-def extract_mygap_pf_data(save_to_file=True):
+def extract_mygap_pf_data(save_to_file=True, field_counts=None, dialog_workers=DIALOG_WORKERS):
     """Extract all available data from MyGAP certification table with optimized session handling"""
     print("Fetching data from MyGAP website with optimized session...")
     
-    # Create optimized session with connection pooling and retry strategy
-    session = create_optimized_session()
-    base_url = 'https://carianmygapmyorganic.doa.gov.my/'
-    
-    # 1. Get the page with pagesize=-1 to get all records
-    response = session.get('https://carianmygapmyorganic.doa.gov.my/mygap_pf_list.php?pagesize=-1')
-    
-    if response.status_code != 200:
-        print(f"Error fetching page: {response.status_code}")
-        return None
-    
-    soup = BeautifulSoup(response.content, 'html.parser')
-    
-    # Find the table by looking for the first data field
-    target_header = soup.find('th', {'data-field': DATA_FIELDS[0]})
-    
-    if not target_header:
-        print(f"Header with data-field='{DATA_FIELDS[0]}' not found")
-        return None
-    
-    # Get the parent table
-    parent_table = target_header.find_parent('table')
-    
-    if not parent_table:
-        print("Could not find parent table")
-        return None
-    
-    print("Table found. Extracting data...")
-    
-    # Find all rows in the table
-    rows = parent_table.find_all('tr')
-    
-    # Find the header row and map field names to column indices
-    header_row_index = None
-    field_to_col_map = {}
-    
-    for i, row in enumerate(rows):
-        headers = row.find_all(['th', 'td'])
-        temp_map = {}
-        
-        for j, header in enumerate(headers):
-            data_field = header.get('data-field')
-            if data_field in DATA_FIELDS:
-                temp_map[data_field] = j
-        
-        # If we found at least one of our target fields, this is likely the header row
-        if temp_map:
-            header_row_index = i
-            field_to_col_map = temp_map
-            break
-    
-    if not field_to_col_map:
-        print("Could not find any target data fields in table headers")
-        return None
-    
-    print(f"Found {len(field_to_col_map)} data fields:")
-    for field in field_to_col_map:
-        print(f"  - {field}")
-    
-    # Phase 1: Extract basic data and collect "More..." requests
-    extracted_data = []
-    dialog_requests = []  # [(field, url, row_index), ...]
-    
-    print("Phase 1: Extracting basic data and identifying truncated fields...")
-    
-    for row_index, row in enumerate(rows[header_row_index + 1:]):
-        cells = row.find_all(['th', 'td'])
-        if len(cells) == 0:
-            continue
-        
-        row_data = {}
-        has_data = False
-        
-        # Extract data for each field we're interested in
-        for field in DATA_FIELDS:
-            if field in field_to_col_map:
-                col_index = field_to_col_map[field]
-                if len(cells) > col_index:
-                    cell = cells[col_index]
-                    cell_data = cell.get_text(strip=True)
-                    
-                    # Check if this cell contains a "More ..." link for truncated content
-                    if 'More' in cell_data and '...' in cell_data:
-                        # Look for the "More ..." link in the cell with data-query attribute
-                        more_link = cell.find('a', attrs={'data-query': re.compile(r'fulltext\.php')})
-                        if more_link:
-                            # Extract the URL from data-query attribute or href
-                            query_url = more_link.get('data-query') or more_link.get('href')
-                            if query_url and query_url != 'javascript:void(0);':
-                                # Add to batch requests instead of fetching immediately
-                                dialog_requests.append((field, query_url, row_index))
-                        else:
-                            # Try to clean up the "More ..." suffix for better data quality
-                            cell_data = re.sub(r'More\s*\.+$', '', cell_data).strip()
-                            if cell_data.endswith(','):
-                                cell_data = cell_data[:-1].strip()
-                    
-                    row_data[field] = cell_data
-                    if cell_data:  # Check if there's actual data
-                        has_data = True
-                else:
-                    row_data[field] = ""
-            else:
-                row_data[field] = ""
-        
-        # Only add rows that have at least some data
-        if has_data:
-            extracted_data.append(row_data)
-    
-    print(f"Phase 1 complete: {len(extracted_data)} records, {len(dialog_requests)} truncated fields found")
-    
-    # Phase 2: Batch fetch all "More..." content
-    if dialog_requests:
-        print("Phase 2: Batch fetching truncated content...")
-        batch_results = batch_fetch_full_content(session, dialog_requests, base_url, max_workers=3)
-        
-        # Phase 3: Update extracted data with full content
-        print("Phase 3: Integrating full content into extracted data...")
-        for row_index, field_contents in batch_results.items():
-            if row_index < len(extracted_data):
-                for field, full_content in field_contents.items():
-                    if full_content:
-                        extracted_data[row_index][field] = full_content
-                        print(f"  Updated {field} for record {row_index + 1}")
-    
-    # Close the session when done
-    session.close()
-    
-    print(f"\nExtracted {len(extracted_data)} records")
+    # 1. Get the page with pagesize=-1 to get all records, resolving "More ..." cells
+    # through a cached session pooled for the dialog workers
+    extracted_data = extract_table(
+        BASE_URL + 'mygap_pf_list.php?pagesize=-1', DATA_FIELDS,
+        resolve_more=True, field_counts=field_counts,
+        dialog_workers=dialog_workers, cached=True
+    )
     
     # Automatically save to file if requested (default behavior)
     if save_to_file and extracted_data:
@@ -296,57 +34,9 @@ def extract_mygap_pf_data(save_to_file=True):
     
     return extracted_data
 
-def save_data(data, format='both'):
+def save_data(data, format='both', metadata=True):
     """Save extracted data to CSV and/or JSON files"""
-    if not data:
-        print("No data to save")
-        return
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    if format in ['csv', 'both']:
-        csv_filename = f"mygap_data_pf_{timestamp}.csv"
-        with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=DATA_FIELDS)
-            writer.writeheader()
-            writer.writerows(data)
-        print(f"Data saved to {csv_filename}")
-    
-    if format in ['json', 'both']:
-        json_filename = f"mygap_data_pf_{timestamp}.json"
-        
-        # Create structured JSON with metadata
-        json_data = {
-            "metadata": {
-                "extracted_at": datetime.now().isoformat(),
-                "timestamp": timestamp,
-                "total_records": len(data),
-                "fields": DATA_FIELDS
-            },
-            "data": data
-        }
-        
-        with open(json_filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(json_data, jsonfile, indent=2, ensure_ascii=False)
-        print(f"Data saved to {json_filename}")
-
-def display_sample_data(data, num_samples=5):
-    """Display a sample of the extracted data"""
-    if not data:
-        print("No data to display")
-        return
-    
-    print(f"\nDisplaying first {min(num_samples, len(data))} records:")
-    print("-" * 80)
-    
-    for i, record in enumerate(data[:num_samples], 1):
-        print(f"\nRecord {i}:")
-        for field, value in record.items():
-            if value:  # Only show fields with data
-                print(f"  {field}: {value}")
-    
-    if len(data) > num_samples:
-        print(f"\n... and {len(data) - num_samples} more records")
+    save_records(data, DATA_FIELDS, 'mygap_data_pf', format, metadata)
 
 def run_enhanced_extraction():
     """Run the enhanced extraction and show progress"""
@@ -357,7 +47,8 @@ def run_enhanced_extraction():
     print("=" * 60)
     
     # Run the enhanced extraction
-    data = extract_mygap_pf_data(save_to_file=True)
+    field_counts = dict.fromkeys(DATA_FIELDS, 0)
+    data = extract_mygap_pf_data(save_to_file=True, field_counts=field_counts)
     
     if data:
         print(f"\n=== EXTRACTION COMPLETE ===")
@@ -387,13 +78,10 @@ def run_enhanced_extraction():
             print(f"\n{i}. {example['nama']} ({example['no_pensijilan']})")
             print(f"   Plants: {example['jenis_tanaman'][:100]}...")
         
-        # Field completion analysis
-        field_counts = {}
-        for field in ['no_pensijilan', 'nama', 'jenis_tanaman', 'negeri', 'daerah']:
-            field_counts[field] = sum(1 for record in data if record.get(field, '').strip())
-        
+        # Field completion analysis, from the counts gathered during extraction
         print(f"\n=== DATA QUALITY ===")
-        for field, count in field_counts.items():
+        for field in ['no_pensijilan', 'nama', 'jenis_tanaman', 'negeri', 'daerah']:
+            count = field_counts[field]
             percentage = (count / len(data)) * 100 if data else 0
             print(f"{field}: {count}/{len(data)} ({percentage:.1f}%)")
             
@@ -408,8 +96,9 @@ if __name__ == "__main__":
         # Run enhanced extraction with summary
         run_enhanced_extraction()
     else:
-        # Run standard extraction
-        mygap_data = extract_mygap_pf_data()
+        # Run standard extraction, counting non-empty values for each field as rows are read
+        field_counts = dict.fromkeys(DATA_FIELDS, 0)
+        mygap_data = extract_mygap_pf_data(field_counts=field_counts)
         
         if mygap_data:
             # Display sample data
@@ -422,11 +111,6 @@ if __name__ == "__main__":
             print(f"\n=== SUMMARY ===")
             print(f"Total records extracted: {len(mygap_data)}")
             
-            # Count non-empty values for each field
-            field_counts = {}
-            for field in DATA_FIELDS:
-                field_counts[field] = sum(1 for record in mygap_data if record.get(field, '').strip())
-            
             print("\nField completion rates:")
             for field, count in field_counts.items():
                 percentage = (count / len(mygap_data)) * 100 if mygap_data else 0